@@ -27,6 +27,7 @@ class Package(boilerplates.setup.Package):
         'Topic :: System :: Logging',
         'Typing :: Typed']
     keywords = ['timing', 'timer', 'time measurement', 'profiling', 'reproducibility']
+    entry_points = {'console_scripts': ['timing = timing.__main__:main']}
 
 
 if __name__ == '__main__':
@@ -0,0 +1,84 @@
+"""Tests of constant-size aggregation of timings."""
+
+import unittest
+
+import numpy as np
+
+from timing.aggregate import TimingAggregate
+from timing.cache import TimingCache
+from timing.config import TimingConfig
+from timing.group import TimingGroup
+from timing.snapshot import TimingSnapshot
+from timing.utils import get_timing_group
+
+
+class Tests(unittest.TestCase):
+
+    def test_aggregate(self):
+        elapsed = np.random.default_rng(0).uniform(0.0, 1.0, 10000)
+        aggregate = TimingAggregate(100)
+        for value in elapsed:
+            aggregate.add(float(value))
+        self.assertEqual(aggregate.count, 10000)
+        self.assertAlmostEqual(aggregate.total, elapsed.sum())
+        self.assertEqual(aggregate.min, elapsed.min())
+        self.assertEqual(aggregate.max, elapsed.max())
+        self.assertAlmostEqual(aggregate.mean, elapsed.mean())
+        self.assertAlmostEqual(aggregate.var, elapsed.var())
+        self.assertEqual(len(aggregate.reservoir), 100)
+        self.assertTrue(set(aggregate.reservoir) <= set(elapsed.tolist()))
+        summary = aggregate.summarize()
+        self.assertAlmostEqual(summary['median'], 0.5, delta=0.2)
+        self.assertIn('median', summary['estimated'])
+        self.assertIn('samples', summary['exact'])
+
+    def test_aggregate_only_group(self):
+        timers = TimingGroup('timings.aggregate_only', aggregate_only=True)
+        self.assertTrue(timers.aggregate_only)
+        for _ in timers.measure_many('loop', samples=2000):
+            pass
+        with timers.measure('context'):
+            pass
+        self.assertEqual(len(timers), 0)
+        self.assertListEqual(timers.timings, [])
+        self.assertEqual(timers.summary['loop']['samples'], 2000)
+        self.assertEqual(len(timers.summary['loop']['data']), TimingConfig.reservoir_size)
+        self.assertEqual(timers.summary['context']['samples'], 1)
+
+        snapshot = timers.swap()
+        self.assertEqual(snapshot.summary['loop']['samples'], 2000)
+        timers.summarize()
+        self.assertDictEqual(timers.summary, {})
+
+        aggregated = TimingSnapshot.from_group(snapshot)
+        self.assertEqual(TimingSnapshot.from_bytes(aggregated.to_bytes()), aggregated)
+        stats = aggregated.groups['timings.aggregate_only']['loop']
+        self.assertEqual(stats.count, 2000)
+        self.assertTrue(stats.sketch.weighted)
+        self.assertAlmostEqual(stats.sketch.counts.sum(), 2000)
+        self.assertAlmostEqual(stats.var, snapshot.summary['loop']['var'])
+
+    def test_aggregate_only_dotted_names(self):
+        timers = TimingGroup('timings.aggregate_only_parent', aggregate_only=True)
+        for _ in range(5):
+            timers.start('child.spam').stop()
+        child = get_timing_group('timings.aggregate_only_parent.child')
+        self.assertTrue(child.aggregate_only)
+        self.assertListEqual(child.timings, [])
+        self.assertEqual(child.aggregates['spam'].count, 5)
+
+    def test_aggregate_only_config(self):
+        TimingCache.clear()
+        TimingConfig.aggregate_only = True
+        try:
+            timers = get_timing_group('timings.aggregate_only_config')
+        finally:
+            TimingConfig.aggregate_only = False
+        self.assertTrue(timers.aggregate_only)
+        timers.start('spam').stop()
+        self.assertListEqual(TimingCache.chronological, [])
+        get_timing_group('timings.not_aggregated').start('spam').stop()
+        table = TimingCache.summary_table()
+        self.assertListEqual(table['group'].tolist(), [
+            'timings.aggregate_only_config', 'timings.not_aggregated'])
+        self.assertListEqual(table['samples'].tolist(), [1, 1])
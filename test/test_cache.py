@@ -0,0 +1,28 @@
+"""Tests of the global cache of timing results."""
+
+import unittest
+
+import numpy as np
+
+from timing.cache import TimingCache
+from timing.utils import get_timing_group
+
+
+class Tests(unittest.TestCase):
+
+    def test_summary_table(self):
+        TimingCache.clear()
+        self.assertEqual(TimingCache.summary_table().size, 0)
+        for group_name in ('timings.table', 'timings.table.sub', 'timings.other_table'):
+            timers = get_timing_group(group_name)
+            for name, samples in (('spam', 7), ('ham', 4), ('eggs', 1)):
+                for _ in timers.measure_many(name, samples=samples):
+                    pass
+        get_timing_group('timings.running').start('running')
+
+        table = TimingCache.summary_table()
+        self.assertEqual(table.size, 9)
+        for row in table:
+            summary = get_timing_group(str(row['group'])).summary[str(row['name'])]
+            for field in ('samples', 'min', 'max', 'mean', 'median', 'var', 'stddev'):
+                self.assertTrue(np.isclose(row[field], summary[field]), msg=(row, field))
@@ -0,0 +1,155 @@
+"""Tests of comparison of timing runs."""
+
+import contextlib
+import io
+import json
+import pathlib
+import tempfile
+import unittest
+
+import numpy as np
+
+from timing.__main__ import main
+from timing.cache import TimingCache
+from timing.compare import collect_samples, compare, load_samples, mann_whitney_u, regressions
+from timing.snapshot import TimingSnapshot
+from timing.utils import get_timing_group
+
+
+def _summaries(**elapsed):
+    return {'timings.compared': {name: {'data': list(data)} for name, data in elapsed.items()}}
+
+
+class Tests(unittest.TestCase):
+
+    def test_mann_whitney_u(self):
+        # exact p-value for small samples without ties, normal approximation would give 0.081
+        self.assertAlmostEqual(mann_whitney_u(np.array([1., 2., 3.]), np.array([4., 5., 6.])),
+                               0.1)
+        self.assertAlmostEqual(mann_whitney_u(np.array([1., 2.]), np.array([3., 4., 5., 6.])),
+                               2 / 15)
+        self.assertAlmostEqual(mann_whitney_u(np.array([1., 4.]), np.array([2., 3.])), 1.0)
+        self.assertAlmostEqual(mann_whitney_u(np.array([1., 2., 3.]), np.array([3., 5., 6.])),
+                               0.1212, places=4)
+        # ties, so normal approximation is used
+        self.assertAlmostEqual(mann_whitney_u(np.arange(20.), np.arange(20.) + 10),
+                               5.2e-5, places=6)
+        self.assertEqual(mann_whitney_u(np.array([1., 1.]), np.array([1., 1.])), 1.0)
+
+    def test_compare(self):
+        rng = np.random.default_rng(0)
+        baseline = _summaries(
+            same=rng.normal(1.0, 0.1, 100), slower=rng.normal(1.0, 0.1, 100),
+            faster=rng.normal(1.0, 0.1, 100), baseline_only=[1.0])
+        candidate = _summaries(
+            same=rng.normal(1.0, 0.1, 100), slower=rng.normal(1.5, 0.1, 100),
+            faster=rng.normal(0.5, 0.1, 100), candidate_only=[1.0])
+        comparisons = compare(baseline, candidate, seed=0)
+        self.assertListEqual([_.name for _ in comparisons], ['slower', 'same', 'faster'])
+        slower, same, faster = comparisons
+        self.assertLess(slower.speedup_low, slower.speedup)
+        self.assertLess(slower.speedup, slower.speedup_high)
+        self.assertLess(slower.speedup_high, 1.0)
+        self.assertLess(slower.p_value, 0.001)
+        self.assertGreater(faster.speedup_low, 1.0)
+        self.assertGreater(same.speedup_high, 1.0)
+        self.assertGreater(same.speedup_low, 0.5)
+        self.assertListEqual(regressions(comparisons), [slower])
+        self.assertListEqual(regressions(comparisons, tolerance=1.0), [])
+
+    def test_sources(self):
+        TimingCache.clear()
+        timers = get_timing_group('timings.compared')
+        for _ in timers.measure_many('loop', samples=10):
+            pass
+        from_cache = collect_samples()
+        self.assertEqual(from_cache['timings.compared', 'loop'].size, 10)
+        from_snapshot = collect_samples(TimingSnapshot.from_cache(raw=True))
+        self.assertTrue(np.array_equal(from_snapshot['timings.compared', 'loop'],
+                                       from_cache['timings.compared', 'loop']))
+        self.assertDictEqual(collect_samples(TimingSnapshot.from_cache()), {})
+        from_summaries = collect_samples({timers.name: timers.summary})
+        self.assertTrue(np.array_equal(from_summaries['timings.compared', 'loop'],
+                                       from_cache['timings.compared', 'loop']))
+
+    def test_cli(self):
+        rng = np.random.default_rng(1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            baseline_path = pathlib.Path(tmp_dir, 'baseline.json')
+            baseline_path.write_text(json.dumps(_summaries(
+                spam=rng.normal(1.0, 0.1, 50).tolist())), encoding='utf-8')
+            candidate_path = pathlib.Path(tmp_dir, 'candidate.jsonl')
+            candidate_path.write_text('\n'.join(
+                json.dumps({'groups': _summaries(spam=rng.normal(2.0, 0.1, 25).tolist())})
+                for _ in range(2)), encoding='utf-8')
+            self.assertEqual(load_samples(candidate_path)['timings.compared', 'spam'].size, 50)
+            snapshot_path = pathlib.Path(tmp_dir, 'snapshot.bin')
+            snapshot_path.write_bytes(TimingSnapshot.from_bytes(
+                TimingSnapshot.from_cache(raw=True).to_bytes()).to_bytes())
+            self.assertIsInstance(load_samples(snapshot_path), dict)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(main(['compare', str(baseline_path), str(candidate_path),
+                                       '--seed', '0']), 1)
+            self.assertIn('REGRESSION timings.compared.spam', output.getvalue())
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                self.assertEqual(main(['compare', str(candidate_path), str(baseline_path),
+                                       '--resamples', '100']), 0)
+            self.assertIn('0 regressions in 1 compared timings', output.getvalue())
+
+    def test_load_single_report(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            report_path = pathlib.Path(tmp_dir, 'report.jsonl')
+            report_path.write_text(json.dumps({
+                'timestamp': '2024-01-01T00:00:00', 'interval': 1.0,
+                'groups': _summaries(spam=[1.0, 2.0])}) + '\n', encoding='utf-8')
+            samples = load_samples(report_path)
+        self.assertListEqual(list(samples), [('timings.compared', 'spam')])
+        self.assertListEqual(samples['timings.compared', 'spam'].tolist(), [1.0, 2.0])
+
+    def test_cli_nothing_compared(self):
+        timers = get_timing_group('timings.compared')
+        with timers.measure('spam'):
+            pass
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            summaries_path = pathlib.Path(tmp_dir, 'summaries.json')
+            summaries_path.write_text(json.dumps(_summaries(spam=[1.0, 2.0])), encoding='utf-8')
+            other_path = pathlib.Path(tmp_dir, 'other.json')
+            other_path.write_text(json.dumps(_summaries(eggs=[1.0, 2.0])), encoding='utf-8')
+            snapshot_path = pathlib.Path(tmp_dir, 'snapshot.bin')
+            snapshot_path.write_bytes(TimingSnapshot.from_cache().to_bytes())
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors), self.assertLogs(level='WARNING') as logs:
+                self.assertEqual(main(['compare', str(summaries_path), str(snapshot_path)]), 2)
+            self.assertIn('without raw data', logs.output[0])
+            self.assertIn(f'error: no samples in {snapshot_path}', errors.getvalue())
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors):
+                self.assertEqual(main(['compare', str(summaries_path), str(other_path)]), 2)
+            self.assertIn('timings.compared.eggs, timings.compared.spam', errors.getvalue())
+            self.assertIn('error: no timings are present in both runs', errors.getvalue())
+
+    def test_cli_invalid_input(self):
+        timers = get_timing_group('timings.compared')
+        with timers.measure('spam'):
+            pass
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            summaries_path = pathlib.Path(tmp_dir, 'summaries.json')
+            summaries_path.write_text(json.dumps(_summaries(spam=[1.0, 2.0])), encoding='utf-8')
+            snapshot = TimingSnapshot.from_cache(raw=True).to_bytes()
+            invalid_inputs = {
+                'truncated.bin': snapshot[:-3], 'magic.bin': snapshot[:2],
+                'invalid.json': b'{"spam": ', 'list.json': b'[1, 2]', 'values.json': b'{"a": 1}'}
+            for file_name, data in invalid_inputs.items():
+                path = pathlib.Path(tmp_dir, file_name)
+                path.write_bytes(data)
+                errors = io.StringIO()
+                with contextlib.redirect_stderr(errors):
+                    self.assertEqual(main(['compare', str(summaries_path), str(path)]), 2)
+                self.assertIn(f'error: cannot load {path}', errors.getvalue())
+            missing_path = pathlib.Path(tmp_dir, 'missing.json')
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors):
+                self.assertEqual(main(['compare', str(missing_path), str(summaries_path)]), 2)
+            self.assertIn(f'error: cannot load {missing_path}', errors.getvalue())
@@ -5,7 +5,9 @@ import logging
 import time
 import types
 import unittest
+import unittest.mock
 
+from timing.config import TimingConfig
 from timing.group import TimingGroup
 from timing.utils import get_timing_group, query_cache
 
@@ -122,3 +124,43 @@ class Tests(unittest.TestCase):
         self.assertIs(timers, query_cache('timings.root_group.subgroup'))
         self.assertIs(timers, query_cache('timings.root_group', 'subgroup'))
         self.assertIs(timers, query_cache('timings', 'root_group', 'subgroup'))
+
+    def test_measure_slow_threshold(self):
+        timers = TimingGroup('timings.slow_threshold')
+
+        for duration in (0.001, 0.03, 0.001):
+            with timers.measure('context', slow_threshold=0.02):
+                time.sleep(duration)
+        self.assertEqual(len(timers.slow_calls['context']), 1)
+        slow_call = timers.slow_calls['context'][0]
+        self.assertGreater(slow_call.timing.elapsed, 0.02)
+        self.assertIsNone(slow_call.args)
+        self.assertEqual(slow_call.stack[-1].name, 'test_measure_slow_threshold')
+
+        def sleep(duration, message=None):
+            time.sleep(duration)
+            return message
+        sleep = timers.measure(sleep, slow_threshold=0.02)
+        self.assertEqual(sleep(0.03, message='spam'), 'spam')
+        sleep(0.001)
+        self.assertEqual(len(timers.slow_calls['sleep']), 1)
+        slow_call = timers.slow_calls['sleep'][0]
+        self.assertEqual(slow_call.args, (0.03,))
+        self.assertEqual(slow_call.kwargs, {'message': 'spam'})
+        self.assertEqual(slow_call.stack[-1].name, 'test_measure_slow_threshold')
+
+    def test_measure_slow_percentile(self):
+        timers = TimingGroup('timings.slow_percentile')
+        with unittest.mock.patch.object(TimingConfig, 'slow_calls_capacity', 1000):
+            # no estimate of the percentile is available until 100 calls are made
+            for _ in range(100):
+                with timers.measure('fast', slow_percentile=99):
+                    time.sleep(0.001)
+            self.assertNotIn('fast', timers.slow_calls)
+            for _ in range(100):
+                with timers.measure('fast', slow_percentile=99):
+                    time.sleep(0.001)
+            self.assertLessEqual(len(timers.slow_calls.get('fast', [])), 10)
+            with timers.measure('fast', slow_percentile=99):
+                time.sleep(0.01)
+        self.assertGreater(timers.slow_calls['fast'][-1].timing.elapsed, 0.01)
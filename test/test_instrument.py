@@ -0,0 +1,111 @@
+"""Tests of timing of all functions of a class or a module."""
+
+import asyncio
+import inspect
+import types
+import unittest
+
+from timing.group import TimingGroup
+from timing.instrument import instrument
+
+
+class Recipe:
+    """Example class to instrument."""
+
+    def __init__(self):
+        self._spam = 0
+
+    def eggs(self, count):
+        return count * 2 + self._spam
+
+    def _private(self):
+        return f'private {self._spam}'
+
+    async def cook(self, duration):
+        await asyncio.sleep(duration)
+        return self._spam
+
+    def courses(self):
+        yield from range(self._spam)
+
+    @staticmethod
+    def ham():
+        return 'ham'
+
+    @classmethod
+    def bacon(cls):
+        return cls.__name__
+
+    @property
+    def spam(self):
+        return self._spam
+
+    @spam.setter
+    def spam(self, value):
+        self._spam = value
+
+
+class Tests(unittest.TestCase):
+
+    def test_class(self):
+        original_eggs = Recipe.__dict__['eggs']
+        parent = TimingGroup('timings.instrumented')
+        with instrument(Recipe, parent) as instrumentation:
+            self.assertTrue(instrumentation.enabled)
+            self.assertEqual(instrumentation.group.name, 'timings.instrumented.Recipe')
+            self.assertListEqual(
+                sorted(instrumentation.names), ['bacon', 'cook', 'eggs', 'ham', 'spam'])
+            recipe = Recipe()
+            self.assertEqual(recipe.eggs(2), 4)
+            self.assertEqual(Recipe.ham(), 'ham')
+            self.assertEqual(recipe.bacon(), 'Recipe')
+            recipe.spam = 5
+            self.assertEqual(recipe.spam, 5)
+            self.assertEqual(
+                recipe._private(), 'private 5')  # pylint: disable = protected-access
+            with self.assertRaises(AssertionError):
+                instrument(Recipe)
+            summary = instrumentation.group.summary
+            self.assertListEqual(
+                sorted(summary), ['bacon', 'eggs', 'ham', 'spam:get', 'spam:set'])
+            self.assertTrue(inspect.iscoroutinefunction(Recipe.cook))
+            self.assertEqual(asyncio.run(recipe.cook(0.05)), 5)
+            instrumentation.group.summarize()
+            self.assertGreaterEqual(instrumentation.group.summary['cook']['min'], 0.04)
+            self.assertListEqual(list(recipe.courses()), [0, 1, 2, 3, 4])
+            self.assertNotIn('courses', instrumentation.group.summary)
+            self.assertEqual(Recipe.eggs.__name__, 'eggs')
+            self.assertIsNot(Recipe.__dict__['eggs'], original_eggs)
+        self.assertFalse(instrumentation.enabled)
+        self.assertIs(Recipe.__dict__['eggs'], original_eggs)
+        Recipe().eggs(1)
+        instrumentation.group.summarize()
+        self.assertEqual(instrumentation.group.summary['eggs']['samples'], 1)
+
+        instrumentation.enable()
+        Recipe().eggs(1)
+        instrumentation.disable()
+        instrumentation.group.summarize()
+        self.assertEqual(instrumentation.group.summary['eggs']['samples'], 2)
+
+    def test_class_aggregate_only(self):
+        parent = TimingGroup('timings.instrumented_aggregate_only', aggregate_only=True)
+        with instrument(Recipe, parent, include=['eggs']) as instrumentation:
+            self.assertTrue(instrumentation.group.aggregate_only)
+            for _ in range(5):
+                Recipe().eggs(1)
+        self.assertListEqual(instrumentation.group.timings, [])
+        self.assertEqual(instrumentation.group.aggregates['eggs'].count, 5)
+
+    def test_module(self):
+        module = types.ModuleType('timings_instrumented_module')
+        exec('from os.path import join\n'  # pylint: disable = exec-used
+             'def spam():\n    return "spam"\n'
+             'def ham():\n    return "ham"\n', module.__dict__)
+        instrumentation = instrument(module, exclude=['_*', 'ham'])
+        self.assertEqual(instrumentation.group.name, 'timings_instrumented_module')
+        self.assertListEqual(instrumentation.names, ['spam'])
+        self.assertEqual(getattr(module, 'spam')(), 'spam')
+        self.assertEqual(getattr(module, 'ham')(), 'ham')
+        self.assertEqual(instrumentation.group.summary['spam']['samples'], 1)
+        instrumentation.disable()
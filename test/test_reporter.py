@@ -0,0 +1,147 @@
+"""Tests of periodic reporting of timings."""
+
+import json
+import logging
+import pathlib
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+
+from timing.cache import TimingCache
+from timing.config import TimingConfig
+from timing.reporter import LoggingSink, JsonLinesSink, TimingReporter
+from timing.utils import get_timing_group
+
+
+class Tests(unittest.TestCase):
+
+    def setUp(self):
+        TimingCache.clear()
+
+    def test_swap(self):
+        timers = get_timing_group('timings.swapping')
+        with timers.measure('done'):
+            pass
+        running = timers.start('running')
+        snapshot = timers.swap()
+        self.assertEqual(snapshot.name, 'timings.swapping')
+        self.assertEqual(list(snapshot), ['done'])
+        self.assertEqual(len(snapshot.timings), 1)
+        self.assertEqual(list(timers), ['running'])
+        running.stop()
+        self.assertEqual(list(timers.swap()), ['running'])
+        self.assertEqual(len(timers), 0)
+        self.assertListEqual(timers.timings, [])
+
+    def test_swap_while_stopping(self):
+        # pylint: disable = protected-access
+        timers = get_timing_group('timings.swapping_while_stopping')
+        stopping = timers.start('stopping')
+        # as if stop() in another thread was interrupted before calculating elapsed time
+        stopping._end = time.perf_counter()
+        stopping._state = 2
+        snapshot = timers.swap()
+        self.assertEqual(len(snapshot), 0)
+        self.assertListEqual(timers.timings, [stopping])
+        stopping._calculate_elapsed()
+        self.assertEqual(timers.swap().summary['stopping']['samples'], 1)
+
+    def test_swap_chronological(self):
+        timers = get_timing_group('timings.swapping_chronological')
+        with timers.measure('done'):
+            pass
+        running = timers.start('running')
+        snapshots = TimingCache.swap()
+        self.assertEqual(list(snapshots['timings.swapping_chronological']), ['done'])
+        self.assertListEqual([_ for __, _ in TimingCache.chronological], [running])
+        later = timers.start('running')
+        self.assertListEqual(timers['running'], [running, later])
+        running.stop()
+        TimingCache.swap()
+        self.assertListEqual([_ for __, _ in TimingCache.chronological], [later])
+        self.assertListEqual(timers.timings, [later])
+
+    def test_report(self):
+        reports = []
+        timers = get_timing_group('timings.reporting')
+        reporter = TimingReporter(60.0, reports.append)
+        for _ in timers.measure_many('loop', samples=5):
+            pass
+        report = reporter.report()
+        self.assertIs(reports[-1], report)
+        self.assertEqual(report['groups']['timings.reporting']['loop']['samples'], 5)
+        self.assertNotIn('data', report['groups']['timings.reporting']['loop'])
+        self.assertEqual(len(timers), 0)
+        self.assertListEqual(TimingCache.chronological, [])
+        self.assertDictEqual(reporter.report()['groups'], {})
+
+    def test_report_aggregate_only(self):
+        reports = []
+        TimingConfig.aggregate_only = True
+        try:
+            timers = get_timing_group('timings.reporting_aggregates')
+        finally:
+            TimingConfig.aggregate_only = False
+        reporter = TimingReporter(60.0, reports.append)
+        for _ in timers.measure_many('loop', samples=10):
+            pass
+        report = reporter.report()
+        summary = report['groups']['timings.reporting_aggregates']['loop']
+        self.assertEqual(summary['samples'], 10)
+        self.assertIn('median', summary['estimated'])
+        self.assertNotIn('data', summary)
+        self.assertDictEqual(timers.aggregates, {})
+        self.assertDictEqual(reporter.report()['groups'], {})
+
+    def test_sinks(self):
+        timers = get_timing_group('timings.sinks')
+        with timers.measure('context'):
+            pass
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = pathlib.Path(tmp_dir, 'report.jsonl')
+            with self.assertLogs('timing.reporter', level=logging.INFO) as log:
+                TimingReporter(60.0, LoggingSink(), JsonLinesSink(path)).report()
+            lines = path.read_text(encoding='utf-8').splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['groups']['timings.sinks']['context']['samples'], 1)
+        self.assertTrue(any('timings.sinks.context' in line for line in log.output), log.output)
+
+    def test_background(self):
+        reports = []
+        timers = get_timing_group('timings.background')
+
+        def work():
+            for _ in timers.measure_many('work', threshold=0.1):
+                time.sleep(0.001)
+
+        with TimingReporter(0.02, reports.append) as reporter:
+            self.assertTrue(reporter.running)
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        self.assertFalse(reporter.running)
+        self.assertGreater(len(reports), 1)
+        total = sum(report['groups']['timings.background']['work']['samples']
+                    for report in reports if 'timings.background' in report['groups'])
+        self.assertGreater(total, 0)
+        self.assertEqual(len(timers), 0)
+
+    def test_background_failure(self):
+        reports = []
+        swap = TimingCache.swap
+        failures = [RuntimeError('spam')]
+
+        def failing_swap():
+            if failures:
+                raise failures.pop()
+            return swap()
+
+        with unittest.mock.patch.object(TimingCache, 'swap', side_effect=failing_swap):
+            with self.assertLogs('timing.reporter', level=logging.ERROR) as log:
+                with TimingReporter(0.02, reports.append) as reporter:
+                    time.sleep(0.1)
+                    self.assertTrue(reporter.running)
+        self.assertTrue(any('spam' in line for line in log.output), log.output)
+        self.assertGreater(len(reports), 0)
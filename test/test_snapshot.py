@@ -0,0 +1,103 @@
+"""Tests of serialization and merging of timing statistics."""
+
+import pickle
+import time
+import unittest
+
+import numpy as np
+
+from timing.cache import TimingCache
+from timing.group import TimingGroup
+from timing.snapshot import TimingSnapshot, TimingStats
+from timing.utils import get_timing_group
+
+
+class Tests(unittest.TestCase):
+
+    def test_stats(self):
+        elapsed = np.random.default_rng(0).lognormal(-6, 1, 1000)
+        stats = TimingStats.from_elapsed(elapsed)
+        self.assertIsNone(stats.raw)
+        self.assertEqual(stats.count, 1000)
+        self.assertAlmostEqual(stats.mean, elapsed.mean())
+        self.assertAlmostEqual(stats.var, elapsed.var())
+        self.assertFalse(stats.sketch.weighted)
+        self.assertEqual(stats.min, elapsed.min())
+        self.assertEqual(stats.max, elapsed.max())
+        for quantile in (0.1, 0.5, 0.9, 0.99):
+            self.assertAlmostEqual(
+                stats.quantile(quantile) / np.quantile(elapsed, quantile), 1.0, delta=0.03)
+        raw_stats = TimingStats.from_elapsed(elapsed, raw=True)
+        self.assertEqual(raw_stats.quantile(0.5), np.median(elapsed))
+        self.assertListEqual(raw_stats.summarize()['data'], elapsed.tolist())
+        self.assertNotIn('data', stats.summarize())
+
+    def test_stats_merge(self):
+        elapsed = np.random.default_rng(1).uniform(0.001, 0.01, 500)
+        merged = TimingStats.from_elapsed(elapsed[:200], raw=True).merge(
+            TimingStats.from_elapsed(elapsed[200:], raw=True))
+        whole = TimingStats.from_elapsed(elapsed, raw=True)
+        self.assertEqual(merged.count, whole.count)
+        self.assertAlmostEqual(merged.total, whole.total)
+        self.assertEqual(merged.min, whole.min)
+        self.assertEqual(merged.max, whole.max)
+        self.assertAlmostEqual(merged.mean, whole.mean)
+        self.assertAlmostEqual(merged.var, whole.var)
+        self.assertEqual(merged.sketch, whole.sketch)
+        self.assertTrue(np.array_equal(merged.raw, whole.raw))
+        self.assertIsNone(merged.merge(TimingStats.from_elapsed(elapsed)).raw)
+
+    def test_stats_var(self):
+        elapsed = 1000.0 + np.random.default_rng(2).uniform(0.0, 1e-6, 100)
+        stats = TimingStats.from_elapsed(elapsed[:50]).merge(TimingStats.from_elapsed(elapsed[50:]))
+        self.assertAlmostEqual(stats.var / elapsed.var(), 1.0, places=6)
+
+    def test_size(self):
+        rng = np.random.default_rng(3)
+        snapshot = TimingSnapshot({'timings.size': {
+            f'name{_}': TimingStats.from_elapsed(rng.lognormal(-6, 1, 200)) for _ in range(100)}})
+        self.assertLess(len(snapshot.to_bytes()), 100 * 200 * 8 / 2)
+        self.assertEqual(TimingSnapshot.from_bytes(snapshot.to_bytes()), snapshot)
+
+    def test_serialization(self):
+        timers = TimingGroup('timings.snapshot')
+        for _ in timers.measure_many('loop', samples=100):
+            pass
+        with timers.measure('context'):
+            time.sleep(0.001)
+        timers.start('running')
+        for raw in (False, True):
+            snapshot = TimingSnapshot.from_group(timers, raw=raw)
+            self.assertListEqual(list(snapshot.groups['timings.snapshot']), ['loop', 'context'])
+            data = snapshot.to_bytes()
+            self.assertEqual(TimingSnapshot.from_bytes(data), snapshot)
+        self.assertLess(len(TimingSnapshot.from_group(timers).to_bytes()),
+                        len(pickle.dumps(timers)) / 4)
+        with self.assertRaises(ValueError):
+            TimingSnapshot.from_bytes(b'SPAM' + data[4:])
+        with self.assertRaises(ValueError):
+            TimingSnapshot.from_bytes(data + b'\0')
+
+    def test_deserialization_truncated(self):
+        timers = TimingGroup('timings.snapshot_truncated')
+        for _ in timers.measure_many('loop', samples=10):
+            pass
+        data = TimingSnapshot.from_group(timers, raw=True).to_bytes()
+        for end in range(len(data)):
+            with self.assertRaises(ValueError, msg=end):
+                TimingSnapshot.from_bytes(data[:end])
+
+    def test_merge(self):
+        TimingCache.clear()
+        get_timing_group('timings.nodes.a').start('spam').stop()
+        first = TimingSnapshot.from_bytes(TimingSnapshot.from_cache().to_bytes())
+        TimingCache.clear()
+        get_timing_group('timings.nodes.a').start('spam').stop()
+        get_timing_group('timings.nodes').start('ham').stop()
+        second = TimingSnapshot.from_bytes(TimingSnapshot.from_cache().to_bytes())
+        merged = TimingSnapshot.merge(first, second)
+        self.assertEqual(merged.summary['timings.nodes.a']['spam']['samples'], 2)
+        self.assertEqual(merged.summary['timings.nodes']['ham']['samples'], 1)
+        hierarchy = merged.hierarchical
+        self.assertIs(hierarchy['timings']['nodes']['a']['.'], merged.groups['timings.nodes.a'])
+        self.assertIs(hierarchy['timings']['nodes']['.'], merged.groups['timings.nodes'])
@@ -1,10 +1,14 @@
 """Initialization of timing package."""
 
 __all__ = [
-    'TimingConfig', 'Timing', 'TimingGroup', 'TimingCache', 'get_timing_group', 'query_cache']
+    'TimingConfig', 'Timing', 'TimingGroup', 'TimingCache', 'get_timing_group', 'query_cache',
+    'TimingReporter', 'TimingSnapshot', 'instrument']
 
 from .config import TimingConfig
 from .timing import Timing
 from .group import TimingGroup
 from .cache import TimingCache
 from .utils import get_timing_group, query_cache
+from .reporter import TimingReporter
+from .snapshot import TimingSnapshot
+from .instrument import instrument
@@ -0,0 +1,79 @@
+"""Command-line interface of timing package."""
+
+import argparse
+import sys
+import typing as t
+
+from .compare import Samples, compare_samples, load_samples
+
+
+def _load_run(path: str) -> Samples:
+    """Load samples of a run, and raise ValueError if it cannot be loaded or has no samples."""
+    try:
+        samples = load_samples(path)
+    except (OSError, ValueError) as err:
+        raise ValueError(f'cannot load {path}: {err}') from err
+    if not samples:
+        raise ValueError(f'no samples in {path}, it needs raw data to be compared')
+    return samples
+
+
+def main(args: t.Optional[t.Sequence[str]] = None) -> int:
+    """Compare two timing runs, print results and return non-zero if there are regressions."""
+    parser = argparse.ArgumentParser(
+        prog='timing', description='Compare timings of two runs and detect regressions.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compare_parser = subparsers.add_parser(
+        'compare', help='compare baseline and candidate runs',
+        description='Match timing names between runs, and report speedup of the candidate with'
+        ' a bootstrap confidence interval and Mann-Whitney U test p-value, from the largest'
+        ' slowdown. Exit with status 1 if there are any regressions, and with status 2 if'
+        ' the runs cannot be loaded or nothing could be compared.')
+    compare_parser.add_argument(
+        'baseline', help='binary snapshot or JSON summaries (or reports) of the baseline run')
+    compare_parser.add_argument(
+        'candidate', help='binary snapshot or JSON summaries (or reports) of the candidate run')
+    compare_parser.add_argument(
+        '--alpha', type=float, default=0.05, help='significance level (default: %(default)s)')
+    compare_parser.add_argument(
+        '--tolerance', type=float, default=0.0,
+        help='fraction of slowdown that is not reported as regression (default: %(default)s)')
+    compare_parser.add_argument(
+        '--confidence', type=float, default=0.95,
+        help='confidence level of the speedup intervals (default: %(default)s)')
+    compare_parser.add_argument(
+        '--resamples', type=int, default=1000,
+        help='number of bootstrap resamples (default: %(default)s)')
+    compare_parser.add_argument('--seed', type=int, help='random seed for bootstrapping')
+    parsed_args = parser.parse_args(args)
+
+    try:
+        baseline_samples, candidate_samples = \
+            _load_run(parsed_args.baseline), _load_run(parsed_args.candidate)
+    except ValueError as err:
+        print(f'error: {err}', file=sys.stderr)
+        return 2
+    unmatched = baseline_samples.keys() ^ candidate_samples.keys()
+    if unmatched:
+        print(f'warning: {len(unmatched)} timings are present in only one of the runs: '
+              + ', '.join(sorted(f'{group}.{name}' for group, name in unmatched)),
+              file=sys.stderr)
+    comparisons = compare_samples(
+        baseline_samples, candidate_samples,
+        parsed_args.confidence, parsed_args.resamples, parsed_args.seed)
+    if not comparisons:
+        print('error: no timings are present in both runs', file=sys.stderr)
+        return 2
+    regressions_count = 0
+    for comparison in comparisons:
+        if comparison.is_regression(parsed_args.alpha, parsed_args.tolerance):
+            regressions_count += 1
+            print(f'REGRESSION {comparison}')
+        else:
+            print(comparison)
+    print(f'{regressions_count} regressions in {len(comparisons)} compared timings')
+    return 1 if regressions_count else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Constant-size aggregation of timings."""
+
+import math
+import random
+import typing as t
+
+import numpy as np
+
+from .timing import Timing
+
+if t.TYPE_CHECKING:
+    from .group import TimingGroup
+
+EXACT_STATISTICS = ('samples', 'min', 'max', 'mean', 'var', 'stddev')
+ESTIMATED_STATISTICS = ('data', 'median')
+
+
+class TimingAggregate:  # pylint: disable = too-many-instance-attributes
+    """Statistics of timings with one name, which use constant memory regardless of their count.
+
+    Count, sum, min, max, mean and variance are exact (the latter two use Welford's algorithm).
+    Additionally, a uniform random sample of elapsed times of a fixed size is kept in a reservoir,
+    and used to estimate the median and the distribution.
+    """
+
+    def __init__(self, reservoir_size: int):
+        assert reservoir_size > 0, reservoir_size
+        self._reservoir_size = reservoir_size
+        self.count: int = 0
+        self.total: float = 0.0
+        self.min: float = math.inf
+        self.max: float = -math.inf
+        self.mean: float = 0.0
+        self._m2: float = 0.0
+        self.reservoir: t.List[float] = []
+
+    @property
+    def var(self) -> float:
+        assert self.count > 0, 'no timings were aggregated yet'
+        return self._m2 / self.count
+
+    def add(self, elapsed: float) -> None:
+        """Include an elapsed time in the statistics."""
+        self.count += 1
+        self.total += elapsed
+        self.min = min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+        delta = elapsed - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (elapsed - self.mean)
+        if len(self.reservoir) < self._reservoir_size:
+            self.reservoir.append(elapsed)
+        else:
+            index = random.randrange(self.count)
+            if index < self._reservoir_size:
+                self.reservoir[index] = elapsed
+
+    def summarize(self) -> t.Dict[str, t.Any]:
+        """Return statistics in the format of TimingGroup.summary entries.
+
+        Additionally, the 'exact' and 'estimated' entries list which of the statistics are exact
+        and which are estimated from the reservoir sample.
+        """
+        var = self.var
+        return {
+            'data': list(self.reservoir),
+            'samples': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'median': np.median(self.reservoir),
+            'var': var,
+            'stddev': math.sqrt(var),
+            'exact': EXACT_STATISTICS,
+            'estimated': ESTIMATED_STATISTICS}
+
+
+class AggregatedTiming(Timing):
+    """Timing that adds its elapsed time to the aggregate statistics of its group when stopped."""
+
+    def __init__(self, name: str, group: 'TimingGroup'):
+        super().__init__(name)
+        self._group = group
+
+    def stop(self) -> None:
+        super().stop()
+        self._group._aggregate(self._name, self.elapsed)  # pylint: disable = protected-access
@@ -4,6 +4,8 @@ import collections
 import datetime
 import typing as t
 
+import numpy as np
+
 from .timing import Timing
 from .group import TimingGroup
 
@@ -73,6 +75,83 @@ class TimingCache:
         cls.flat = collections.OrderedDict()
         cls.chronological = []
 
+    @classmethod
+    def swap(cls) -> t.Dict[str, TimingGroup]:
+        """Detach finished timings from every cached group and from the chronological record.
+
+        Chronological entries of timings that stay in their groups (i.e. are still running)
+        are kept.
+
+        Return a mapping from group names to the detached groups, see TimingGroup.swap().
+        """
+        groups = list(cls.flat.items())
+        snapshots = {name: group.swap() for name, group in groups}
+        # entries appended from now on belong to timings that were started after the swap,
+        # and entries are only ever appended, so replacing the leading ones in one step is safe
+        chronological = cls.chronological
+        swapped = len(chronological)
+        remaining = {id(_) for __, group in groups for _ in group.timings}
+        chronological[:swapped] = [_ for _ in chronological[:swapped] if id(_[1]) in remaining]
+        return snapshots
+
+    @classmethod
+    def summary_table(cls) -> np.ndarray:
+        """Calculate statistics of finished timings of all groups in a single pass.
+
+        Return a structured array with one row per timing name in each group, in the order
+        of TimingCache.flat and of timing names within groups, with fields:
+        'group', 'name', 'samples', 'min', 'max', 'mean', 'median', 'var' and 'stddev'.
+
+        Elapsed times of all timings are concatenated into one array, and the statistics are
+        calculated using segmented reductions over it, instead of separately for each name.
+
+        Groups in aggregate-only mode are included as well, with median estimated from
+        the reservoir sample.
+        """
+        rows, columns, aggregated = cls._collect_summary_rows()
+        table = np.zeros(len(rows), dtype=[
+            ('group', str, max((len(_) for _, __ in rows), default=1)),
+            ('name', str, max((len(_) for __, _ in rows), default=1)),
+            ('samples', np.int64), ('min', np.float64), ('max', np.float64),
+            ('mean', np.float64), ('median', np.float64), ('var', np.float64),
+            ('stddev', np.float64)])
+        if columns:
+            calculated = np.zeros(len(columns), dtype=table.dtype)
+            _calculate_segmented_statistics(calculated, list(columns.values()))
+            table[list(columns)] = calculated
+        for index, stats in aggregated.items():
+            for field in ('samples', 'min', 'max', 'mean', 'median', 'var', 'stddev'):
+                table[field][index] = stats[field]
+        table['group'] = [_ for _, __ in rows]
+        table['name'] = [_ for __, _ in rows]
+        return table
+
+    @classmethod
+    def _collect_summary_rows(cls) -> t.Tuple[
+            t.List[t.Tuple[str, str]], t.Dict[int, t.List[float]],
+            t.Dict[int, t.Dict[str, t.Any]]]:
+        """Gather group and timing names of rows of the summary table, and data for them.
+
+        Return names of all rows in the order of the cache, elapsed times of finished timings
+        keyed by row index, and summaries of aggregates keyed by row index.
+        """
+        rows: t.List[t.Tuple[str, str]] = []
+        columns: t.Dict[int, t.List[float]] = {}
+        aggregated: t.Dict[int, t.Dict[str, t.Any]] = {}
+        for group_name, group in list(cls.flat.items()):
+            if group.aggregate_only:
+                group.summarize()
+                for name, stats in group.summary.items():
+                    aggregated[len(rows)] = stats
+                    rows.append((group_name, name))
+                continue
+            for name, timings in list(group.items()):
+                elapsed = [_.elapsed for _ in timings if _.finished]
+                if elapsed:
+                    columns[len(rows)] = elapsed
+                    rows.append((group_name, name))
+        return rows, columns, aggregated
+
     @classmethod
     def query(cls, *name_fragments: str) -> t.Union[dict, TimingGroup, Timing]:
         """Query the cache using one or more name fragments."""
@@ -83,3 +162,26 @@ class TimingCache:
         for _, name_fragment in enumerate(normalized_name_fragments):
             timing_cache = timing_cache[name_fragment]
         return timing_cache['.']
+
+
+def _calculate_segmented_statistics(table: np.ndarray, columns: t.List[t.List[float]]) -> None:
+    """Fill in statistics of each column into the corresponding row of the table.
+
+    Use segmented reductions over all the columns concatenated into one array.
+    """
+    counts = np.fromiter((len(_) for _ in columns), dtype=np.int64, count=len(columns))
+    values = np.fromiter(
+        (_ for column in columns for _ in column), dtype=np.float64, count=counts.sum())
+    starts = np.zeros_like(counts)
+    np.cumsum(counts[:-1], out=starts[1:])
+    segments = np.repeat(np.arange(len(columns)), counts)
+
+    table['samples'] = counts
+    table['min'] = np.minimum.reduceat(values, starts)
+    table['max'] = np.maximum.reduceat(values, starts)
+    table['mean'] = np.add.reduceat(values, starts) / counts
+    table['var'] = np.add.reduceat(
+        np.square(values - table['mean'][segments]), starts) / counts
+    table['stddev'] = np.sqrt(table['var'])
+    ordered = values[np.lexsort((values, segments))]
+    table['median'] = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
@@ -0,0 +1,270 @@
+"""Comparison of two timing runs and detection of regressions."""
+
+import json
+import logging
+import math
+import pathlib
+import typing as t
+
+import numpy as np
+
+from .cache import TimingCache
+from .snapshot import MAGIC, TimingSnapshot
+
+_LOG = logging.getLogger(__name__)
+
+Samples = t.Dict[t.Tuple[str, str], np.ndarray]
+"""Elapsed times for each pair of group name and timing name."""
+
+Source = t.Union[TimingSnapshot, t.Mapping[str, t.Mapping[str, t.Mapping[str, t.Any]]], None]
+"""Timings to compare: a snapshot with raw data, summaries of groups (as in TimingGroup.summary,
+including 'data') keyed by group name, or None to use the global cache."""
+
+EXACT_MANN_WHITNEY_SIZE = 20
+"""Samples smaller than this (without ties) get exact p-values of the Mann-Whitney U test."""
+
+_MAX_EXACT_U_STATISTIC = 2 ** 22
+
+_MAX_RESAMPLED_ELEMENTS = 2 ** 20
+
+
+class Comparison(t.NamedTuple):
+    """Comparison of timings with the same name between baseline and candidate runs.
+
+    Speedup is the ratio of baseline median to candidate median, so values below 1 mean that
+    the candidate is slower.
+    """
+
+    group: str
+    name: str
+    baseline_samples: int
+    candidate_samples: int
+    baseline_median: float
+    candidate_median: float
+    speedup: float
+    speedup_low: float
+    """Lower bound of the bootstrap confidence interval of the speedup."""
+    speedup_high: float
+    """Upper bound of the bootstrap confidence interval of the speedup."""
+    p_value: float
+    """Two-sided p-value of the Mann-Whitney U test."""
+
+    def is_regression(self, alpha: float = 0.05, tolerance: float = 0.0) -> bool:
+        """Check if the candidate is significantly slower by more than the given fraction."""
+        return self.p_value < alpha and self.speedup < 1 / (1 + tolerance)
+
+    def __str__(self):
+        return (
+            f'{self.group}.{self.name}: speedup {self.speedup:.3f}'
+            f' [{self.speedup_low:.3f}, {self.speedup_high:.3f}], p={self.p_value:.4f},'
+            f' medians {self.baseline_median:.6g}s -> {self.candidate_median:.6g}s,'
+            f' samples {self.baseline_samples} -> {self.candidate_samples}')
+
+
+def collect_samples(source: Source = None) -> Samples:
+    """Gather elapsed times of finished timings from a snapshot, summaries or the cache.
+
+    Timings without raw data (i.e. snapshots created without raw columns, or summaries without
+    'data') are skipped with a warning.
+    """
+    if source is None:
+        return _collect_samples_from_cache()
+    if isinstance(source, TimingSnapshot):
+        return _collect_samples_from_snapshot(source)
+    return _collect_samples_from_summaries(source)
+
+
+def _collect_samples_from_cache() -> Samples:
+    samples: Samples = {}
+    for group_name, group in list(TimingCache.flat.items()):
+        for name, timings in list(group.items()):
+            elapsed = [_.elapsed for _ in timings if _.finished]
+            if elapsed:
+                samples[group_name, name] = np.array(elapsed, dtype=np.float64)
+    return samples
+
+
+def _collect_samples_from_snapshot(snapshot: TimingSnapshot) -> Samples:
+    samples: Samples = {}
+    skipped = 0
+    for group_name, group_stats in snapshot.groups.items():
+        for name, stats in group_stats.items():
+            if stats.raw is None:
+                skipped += 1
+            else:
+                samples[group_name, name] = stats.raw
+    if skipped:
+        _LOG.warning(
+            'skipped %i timings without raw data in snapshot, create snapshots with raw=True'
+            ' to compare them', skipped)
+    return samples
+
+
+def _collect_samples_from_summaries(
+        summaries: t.Mapping[str, t.Mapping[str, t.Mapping[str, t.Any]]]) -> Samples:
+    samples: Samples = {}
+    skipped = 0
+    for group_name, summary in summaries.items():
+        for name, statistics in summary.items():
+            if statistics.get('data'):
+                samples[group_name, name] = np.array(statistics['data'], dtype=np.float64)
+            else:
+                skipped += 1
+    if skipped:
+        _LOG.warning(
+            'skipped %i timings without data in summaries, create reports with'
+            ' include_data=True to compare them', skipped)
+    return samples
+
+
+def load_samples(path: pathlib.Path | str) -> Samples:
+    """Load elapsed times from a file.
+
+    The file may contain a binary snapshot (see TimingSnapshot.to_bytes()), a JSON object
+    with summaries of groups keyed by group name, or JSON lines with reports created by
+    TimingReporter with include_data enabled -- in which case samples from all reports are joined.
+
+    Raise OSError if the file cannot be read, and ValueError if its contents are not valid.
+    """
+    data = pathlib.Path(path).read_bytes()
+    if data.startswith(MAGIC):
+        return collect_samples(TimingSnapshot.from_bytes(data))
+    text = data.decode('utf-8')
+    try:
+        documents = [json.loads(text)]
+    except json.JSONDecodeError:
+        documents = [json.loads(line) for line in text.splitlines() if line.strip()]
+    chunks: t.Dict[t.Tuple[str, str], t.List[np.ndarray]] = {}
+    for document in documents:
+        if isinstance(document, dict) and 'groups' in document:
+            document = document['groups']
+        try:
+            samples = collect_samples(document)
+        except (AttributeError, TypeError, KeyError) as err:
+            raise ValueError(f'{path} does not contain timing summaries or reports') from err
+        for key, elapsed in samples.items():
+            chunks.setdefault(key, []).append(elapsed)
+    return {key: np.concatenate(arrays) for key, arrays in chunks.items()}
+
+
+def mann_whitney_u(first: np.ndarray, second: np.ndarray) -> float:
+    """Return two-sided p-value of the Mann-Whitney U test.
+
+    The p-value is exact if there are no ties and the smaller sample has fewer than
+    EXACT_MANN_WHITNEY_SIZE values (unless the other one is so large that the distribution
+    of the statistic would not fit in memory). Otherwise, use normal approximation with tie and
+    continuity corrections, which underestimates p-values of small samples.
+    """
+    size1, size2 = first.size, second.size
+    combined = np.concatenate((first, second))
+    _, inverse, counts = np.unique(combined, return_inverse=True, return_counts=True)
+    average_ranks = np.cumsum(counts) - (counts - 1) / 2
+    u_statistic = float(average_ranks[inverse][:size1].sum()) - size1 * (size1 + 1) / 2
+    if counts.size == combined.size and min(size1, size2) < EXACT_MANN_WHITNEY_SIZE \
+            and size1 * size2 <= _MAX_EXACT_U_STATISTIC:
+        distribution = _mann_whitney_u_distribution(size1, size2)
+        u_index = int(round(u_statistic))
+        tail = min(distribution[:u_index + 1].sum(), distribution[u_index:].sum())
+        return min(1.0, 2 * float(tail))
+    return _approximate_mann_whitney_u(u_statistic, size1, size2, counts)
+
+
+def _approximate_mann_whitney_u(
+        u_statistic: float, size1: int, size2: int, counts: np.ndarray) -> float:
+    """Return two-sided p-value using normal approximation, given counts of tied values."""
+    size = size1 + size2
+    ties = float(np.sum(counts.astype(np.float64) ** 3 - counts))
+    variance = size1 * size2 / 12 * ((size + 1) - ties / (size * (size - 1)))
+    if variance <= 0:
+        return 1.0
+    difference = abs(u_statistic - size1 * size2 / 2) - 0.5
+    z_score = max(difference, 0.0) / math.sqrt(variance)
+    return math.erfc(z_score / math.sqrt(2))
+
+
+def _mann_whitney_u_distribution(size1: int, size2: int) -> np.ndarray:
+    """Return probabilities of each value of the U statistic if there are no ties.
+
+    Counts of rank arrangements giving each value are coefficients of the Gaussian binomial
+    coefficient, i.e. of the product of (1 - q^(large + i)) / (1 - q^i) for i = 1..small.
+    """
+    small, large = sorted((size1, size2))
+    counts = np.zeros(small * large + 1, dtype=np.float64)
+    counts[0] = 1
+    for i in range(1, small + 1):
+        # coefficients above the final degree are never needed, so they are dropped
+        if large + i < counts.size:
+            counts[large + i:] -= counts[:counts.size - large - i].copy()
+        for remainder in range(i):
+            np.cumsum(counts[remainder::i], out=counts[remainder::i])
+    counts = np.maximum(counts, 0)  # remove rounding errors of the subtractions
+    return counts / counts.sum()
+
+
+def _bootstrap_medians(
+        samples: np.ndarray, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    medians = np.empty(resamples, dtype=np.float64)
+    chunk = max(1, _MAX_RESAMPLED_ELEMENTS // samples.size)
+    for begin in range(0, resamples, chunk):
+        end = min(begin + chunk, resamples)
+        indices = rng.integers(0, samples.size, size=(end - begin, samples.size))
+        medians[begin:end] = np.median(samples[indices], axis=1)
+    return medians
+
+
+def compare_name(  # pylint: disable = too-many-arguments, too-many-positional-arguments
+        group: str, name: str, baseline: np.ndarray, candidate: np.ndarray,
+        confidence: float = 0.95, resamples: int = 1000,
+        rng: t.Optional[np.random.Generator] = None) -> Comparison:
+    """Compare elapsed times of one timing name between two runs."""
+    assert baseline.size > 0 and candidate.size > 0, (baseline.size, candidate.size)
+    assert 0 < confidence < 1, confidence
+    assert resamples > 0, resamples
+    if rng is None:
+        rng = np.random.default_rng()
+    baseline_median = float(np.median(baseline))
+    candidate_median = float(np.median(candidate))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speedups = _bootstrap_medians(baseline, resamples, rng) \
+            / _bootstrap_medians(candidate, resamples, rng)
+        speedup = float(np.float64(baseline_median) / candidate_median)
+    speedup_low, speedup_high = np.quantile(
+        speedups, [(1 - confidence) / 2, (1 + confidence) / 2])
+    return Comparison(
+        group, name, baseline.size, candidate.size, baseline_median, candidate_median,
+        speedup, float(speedup_low), float(speedup_high), mann_whitney_u(baseline, candidate))
+
+
+def compare(baseline: Source, candidate: Source, confidence: float = 0.95,
+            resamples: int = 1000, seed: t.Optional[int] = None) -> t.List[Comparison]:
+    """Compare timings with matching group and timing names between two runs.
+
+    See compare_samples() for details.
+    """
+    return compare_samples(
+        collect_samples(baseline), collect_samples(candidate), confidence, resamples, seed)
+
+
+def compare_samples(
+        baseline_samples: Samples, candidate_samples: Samples, confidence: float = 0.95,
+        resamples: int = 1000, seed: t.Optional[int] = None) -> t.List[Comparison]:
+    """Compare elapsed times with matching group and timing names between two runs.
+
+    Timings present in only one of the runs are ignored.
+
+    Return the comparisons ordered from the largest slowdown to the largest speedup.
+    """
+    rng = np.random.default_rng(seed)
+    comparisons = [
+        compare_name(
+            group, name, elapsed, candidate_samples[group, name], confidence, resamples, rng)
+        for (group, name), elapsed in baseline_samples.items()
+        if (group, name) in candidate_samples]
+    comparisons.sort(key=lambda _: _.speedup)
+    return comparisons
+
+
+def regressions(comparisons: t.Iterable[Comparison], alpha: float = 0.05,
+                tolerance: float = 0.0) -> t.List[Comparison]:
+    """Select comparisons in which the candidate is significantly slower, see is_regression()."""
+    return [_ for _ in comparisons if _.is_regression(alpha, tolerance)]
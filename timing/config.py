@@ -6,3 +6,9 @@ class TimingConfig:  # pylint: disable = too-few-public-methods
 
     enable_cache: bool = True
     overhead: float = 0.0
+    aggregate_only: bool = False
+    """Default recording mode of new timing groups, see TimingGroup."""
+    reservoir_size: int = 1024
+    """Number of elapsed times sampled for each timing name in aggregate-only mode."""
+    slow_calls_capacity: int = 16
+    """Maximum number of slow calls kept for each timing name, older ones are discarded."""
@@ -1,36 +1,64 @@
 """Handling of group of timings."""
 
+import collections
 import contextlib
 import datetime
 import functools
+import inspect
+import threading
 import types
 import typing as t
 
 import numpy as np
 
+from .aggregate import TimingAggregate, AggregatedTiming
 from .config import TimingConfig
+from .slow_calls import SlowCall, RunningPercentile
 from .timing import Timing
 
 
-class TimingGroup(dict):
-    """Group of timings."""
+class TimingGroup(dict):  # pylint: disable = too-many-instance-attributes
+    """Group of timings.
 
-    def __init__(self, name: str):
+    In aggregate-only mode, individual timings are not stored at all. Instead, only constant-size
+    statistics are kept for each timing name, see TimingAggregate.
+    """
+
+    def __init__(self, name: str, aggregate_only: bool | None = None):
         super().__init__()
         assert isinstance(name, str)
 
         self._name: str = name
+        self._aggregate_only: bool = \
+            TimingConfig.aggregate_only if aggregate_only is None else aggregate_only
+        self._aggregates: t.Dict[str, TimingAggregate] = {}
         self._timings: t.List[Timing] = []
         self._summary: t.Optional[t.Dict[str, t.Any]] = None
+        self._lock = threading.Lock()
+        self._slow_calls: t.Dict[str, t.Deque[SlowCall]] = {}
+        self._slow_percentiles: t.Dict[t.Tuple[str, float], RunningPercentile] = {}
 
     @property
     def name(self) -> str:
         return self._name
 
+    @property
+    def aggregate_only(self) -> bool:
+        return self._aggregate_only
+
+    @property
+    def aggregates(self) -> t.Dict[str, TimingAggregate]:
+        return dict(self._aggregates)
+
     @property
     def timings(self) -> t.List[Timing]:
         return list(self._timings)
 
+    @property
+    def slow_calls(self) -> t.Dict[str, t.List[SlowCall]]:
+        """Return the most recent slow calls captured by measure() for each timing name."""
+        return {name: list(slow_calls) for name, slow_calls in self._slow_calls.items()}
+
     @property
     def summary(self) -> t.Dict[str, t.Any]:
         """Return a collection of statistics for the timings in this group.
@@ -47,24 +75,31 @@ class TimingGroup(dict):
         if '.' in name:
             from .utils import get_timing_group  # pylint: disable = import-outside-toplevel
             prefix, _, suffix = name.rpartition('.')
-            group = get_timing_group(self._name, prefix)
+            group = get_timing_group(self._name, prefix, aggregate_only=self._aggregate_only)
             return group.start(suffix)
 
+        if self._aggregate_only:
+            timing: Timing = AggregatedTiming(name, self)
+            timing.start()
+            return timing
+
         timing = Timing(name)
-        if TimingConfig.enable_cache:
-            from .cache import TimingCache  # pylint: disable = import-outside-toplevel
-            self._timings.append(timing)
-            if self._name in TimingCache.flat and TimingCache.flat[self._name] is self:
-                cache_entry = (datetime.datetime.now(), timing)
-                TimingCache.chronological.append(cache_entry)
-        if name in self:
-            self[name].append(timing)
-        else:
-            self[name] = [timing]
+        with self._lock:
+            if TimingConfig.enable_cache:
+                from .cache import TimingCache  # pylint: disable = import-outside-toplevel
+                self._timings.append(timing)
+                if self._name in TimingCache.flat and TimingCache.flat[self._name] is self:
+                    cache_entry = (datetime.datetime.now(), timing)
+                    TimingCache.chronological.append(cache_entry)
+            if name in self:
+                self[name].append(timing)
+            else:
+                self[name] = [timing]
         timing.start()
         return timing
 
-    def measure(self, function_or_name: t.Callable | str | None = None, name: str | None = None):
+    def measure(self, function_or_name: t.Callable | str | None = None, name: str | None = None,
+                *, slow_threshold: float | None = None, slow_percentile: float | None = None):
         """Use this method as a context manager or decorator.
 
         As context manager:
@@ -79,7 +114,15 @@ class TimingGroup(dict):
 
         @measure(name)
         def ...
+
+        Optionally, context of slow calls can be captured, see slow_calls property.
+        A call is slow if it took longer than slow_threshold seconds, and/or if it took longer
+        than the running slow_percentile (between 0 and 100) of recent timings with the same name.
+        If both are given, both need to be exceeded. Arguments of the call are captured only
+        when measure is used as decorator without parentheses, i.e. measure(function, ...).
         """
+        assert slow_threshold is None or slow_threshold >= 0, slow_threshold
+        assert slow_percentile is None or 0 < slow_percentile < 100, slow_percentile
         if function_or_name is not None:
             if isinstance(function_or_name, str):
                 assert name is None, 'name given in the first argument, 2nd argument must be None'
@@ -93,27 +136,102 @@ class TimingGroup(dict):
             # in practice this path is also taken when @measure(name) is used,
             # but since contextlib uses ContextDecorator, it works
             assert name is not None
-            return self._measure_context(name)
+            return self._measure_context(name, slow_threshold, slow_percentile)
         assert isinstance(function, types.FunctionType)
-        return self._measure_decorator(function, name)
+        return self._measure_decorator(function, name, slow_threshold, slow_percentile)
 
     @contextlib.contextmanager
-    def _measure_context(self, name: str) -> t.Generator[Timing, None, None]:
+    def _measure_context(
+            self, name: str, slow_threshold: float | None = None,
+            slow_percentile: float | None = None) -> t.Generator[Timing, None, None]:
         """Return the just-started timer as context variable."""
         timer = self.start(name)
         yield timer
         timer.stop()
+        if slow_threshold is not None or slow_percentile is not None:
+            if self._is_slow(name, timer, slow_threshold, slow_percentile):
+                self._add_slow_call(name, SlowCall.capture(timer))
+
+    def _measure_decorator(
+            self, function: types.FunctionType, name: str | None = None,
+            slow_threshold: float | None = None, slow_percentile: float | None = None):
+        """Return the original function wrapped so that each call is timed.
 
-    def _measure_decorator(self, function: types.FunctionType, name: str | None = None):
-        """Return the original function wrapped in a timing context."""
+        The wrapper starts and stops the timer directly, to avoid the overhead of creating
+        a context manager for each call.
+
+        Coroutine functions are wrapped in coroutine functions, so that the time until the
+        coroutine finishes is measured.
+        """
         if name is None:
             name = function.__name__
+        start = self.start
+
+        if inspect.iscoroutinefunction(function):
+            return self._measure_coroutine_decorator(
+                function, name, slow_threshold, slow_percentile)
+
+        if slow_threshold is None and slow_percentile is None:
+            @functools.wraps(function)
+            def function_wrapper(*args, **kwargs):
+                timer = start(name)
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    timer.stop()
+            return function_wrapper
 
         @functools.wraps(function)
-        def function_wrapper(*args, **kwargs):
-            with self._measure_context(name):
-                return function(*args, **kwargs)
-        return function_wrapper
+        def slow_call_capturing_wrapper(*args, **kwargs):
+            timer = start(name)
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                timer.stop()
+            if self._is_slow(name, timer, slow_threshold, slow_percentile):
+                self._add_slow_call(name, SlowCall.capture(timer, args, kwargs))
+            return result
+        return slow_call_capturing_wrapper
+
+    def _measure_coroutine_decorator(
+            self, function: types.FunctionType, name: str,
+            slow_threshold: float | None, slow_percentile: float | None):
+        """Return the original coroutine function wrapped so that each awaited call is timed."""
+        start = self.start
+        capture_slow_calls = slow_threshold is not None or slow_percentile is not None
+
+        @functools.wraps(function)
+        async def coroutine_function_wrapper(*args, **kwargs):
+            timer = start(name)
+            try:
+                result = await function(*args, **kwargs)
+            finally:
+                timer.stop()
+            if capture_slow_calls and self._is_slow(name, timer, slow_threshold, slow_percentile):
+                self._add_slow_call(name, SlowCall.capture(timer, args, kwargs))
+            return result
+        return coroutine_function_wrapper
+
+    def _is_slow(self, name: str, timer: Timing, slow_threshold: float | None,
+                 slow_percentile: float | None) -> bool:
+        is_slow = True
+        if slow_percentile is not None:
+            key = (name, slow_percentile)
+            running_percentile = self._slow_percentiles.get(key)
+            if running_percentile is None:
+                running_percentile = self._slow_percentiles.setdefault(
+                    key, RunningPercentile(slow_percentile))
+            is_slow = timer.elapsed > running_percentile.update(timer.elapsed)
+        if slow_threshold is not None:
+            is_slow = is_slow and timer.elapsed > slow_threshold
+        return is_slow
+
+    def _add_slow_call(self, name: str, slow_call: SlowCall) -> None:
+        with self._lock:
+            if name not in self._slow_calls:
+                self._slow_calls[name] = collections.deque(
+                    maxlen=TimingConfig.slow_calls_capacity)
+            self._slow_calls[name].append(slow_call)
 
     def measure_many(self, name: str, samples: t.Optional[int] = None,
                      threshold: t.Optional[float] = None) -> t.Iterator[Timing]:
@@ -145,8 +263,57 @@ class TimingGroup(dict):
             return TimingCache.query(self._name)
         return TimingCache.query(self._name, *name_fragments)
 
+    def swap(self) -> 'TimingGroup':
+        """Detach all finished timings from this group and return them as a new group.
+
+        The recorded timings are exchanged for fresh buffers while holding the lock used by
+        start(), so recording threads are blocked only for the duration of the exchange.
+        Finished timings are then separated from the detached buffers without holding the lock,
+        and timings without elapsed time (i.e. still running, or being stopped by another thread)
+        are put back into this group and will be included in the next swap once they finish.
+
+        In aggregate-only mode, the aggregates are detached and replaced with empty ones.
+        """
+        snapshot = TimingGroup(self._name, self._aggregate_only)
+        with self._lock:
+            snapshot._aggregates, self._aggregates = \
+                self._aggregates, {}  # pylint: disable = protected-access
+            items = list(self.items())
+            timings = self._timings
+            self.clear()
+            self._timings = []
+            self._summary = None
+        running_items: t.List[t.Tuple[str, t.List[Timing]]] = []
+        finished_ids: t.Set[int] = set()
+        for name, name_timings in items:
+            running: t.List[Timing] = []
+            finished: t.List[Timing] = []
+            for timing in name_timings:
+                (finished if timing.finished else running).append(timing)
+            if running:
+                running_items.append((name, running))
+            if finished:
+                snapshot[name] = finished
+                finished_ids.update(id(_) for _ in finished)
+        running_timings: t.List[Timing] = []
+        for timing in timings:
+            if id(timing) in finished_ids:
+                snapshot._timings.append(timing)  # pylint: disable = protected-access
+            else:
+                running_timings.append(timing)
+        if running_items or running_timings:
+            with self._lock:
+                for name, running in running_items:
+                    self[name] = running + self.get(name, [])
+                self._timings = running_timings + self._timings
+                self._summary = None
+        return snapshot
+
     def summarize(self) -> None:
-        """Calculate (or recalculate) various statistics from the raw data."""
+        """Calculate (or recalculate) various statistics from the raw data.
+
+        In aggregate-only mode, statistics are taken from the aggregates instead.
+        """
         self._summary = {}
         for name, timings in self.items():
             elapsed = [_.elapsed for _ in timings]
@@ -161,6 +328,26 @@ class TimingGroup(dict):
                 'median': np.median(array),
                 'var': array.var(),
                 'stddev': array.std()}
+        with self._lock:
+            for name, aggregate in self._aggregates.items():
+                self._summary[name] = aggregate.summarize()
+
+    def _aggregate(self, name: str, elapsed: float) -> None:
+        """Add the elapsed time of a timing to the aggregate statistics of its name."""
+        with self._lock:
+            aggregate = self._aggregates.get(name)
+            if aggregate is None:
+                aggregate = self._aggregates[name] = TimingAggregate(TimingConfig.reservoir_size)
+            aggregate.add(elapsed)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
     def __eq__(self, other):
         if not isinstance(other, TimingGroup):
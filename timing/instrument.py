@@ -0,0 +1,137 @@
+"""Timing of all functions of a class or a module at once."""
+
+import fnmatch
+import inspect
+import types
+import typing as t
+import weakref
+
+from .group import TimingGroup
+from .utils import get_timing_group
+
+_INSTRUMENTED: 'weakref.WeakKeyDictionary[t.Any, Instrumentation]' = weakref.WeakKeyDictionary()
+
+
+class Instrumentation:
+    """Timing wrappers installed on members of a class or a module.
+
+    The wrappers are created once, and can be removed and reinstalled at runtime
+    using disable() and enable().
+    """
+
+    def __init__(self, target: type | types.ModuleType, group: TimingGroup,
+                 include: t.Sequence[str], exclude: t.Sequence[str]):
+        self._target = target
+        self._group = group
+        self._originals: t.Dict[str, t.Any] = {}
+        self._wrappers: t.Dict[str, t.Any] = {}
+        self._enabled = False
+        for name, member in list(vars(target).items()):
+            if not any(fnmatch.fnmatchcase(name, _) for _ in include) \
+                    or any(fnmatch.fnmatchcase(name, _) for _ in exclude):
+                continue
+            wrapper = self._wrap(name, member)
+            if wrapper is not None:
+                self._originals[name] = member
+                self._wrappers[name] = wrapper
+
+    @property
+    def target(self) -> type | types.ModuleType:
+        return self._target
+
+    @property
+    def group(self) -> TimingGroup:
+        return self._group
+
+    @property
+    def names(self) -> t.List[str]:
+        """Names of the instrumented members."""
+        return list(self._wrappers)
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self) -> None:
+        """Install the timing wrappers."""
+        assert self._target not in _INSTRUMENTED, f'{self._target} is already instrumented'
+        for name, wrapper in self._wrappers.items():
+            setattr(self._target, name, wrapper)
+        _INSTRUMENTED[self._target] = self
+        self._enabled = True
+
+    def disable(self) -> None:
+        """Restore the original members."""
+        assert _INSTRUMENTED.get(self._target) is self, f'{self._target} is not instrumented'
+        for name, original in self._originals.items():
+            setattr(self._target, name, original)
+        del _INSTRUMENTED[self._target]
+        self._enabled = False
+
+    def _wrap(self, name: str, member: t.Any) -> t.Any:
+        """Return a timing wrapper of the member, or None if it's not supported."""
+        if isinstance(self._target, types.ModuleType):
+            if _is_supported(member) and member.__module__ == self._target.__name__:
+                return self._group.measure(member, name)
+            return None
+        if _is_supported(member):
+            return self._group.measure(member, name)
+        if isinstance(member, (staticmethod, classmethod)) and _is_supported(member.__func__):
+            return type(member)(self._group.measure(member.__func__, name))
+        if isinstance(member, property):
+            fget, fset, fdel = [
+                None if accessor is None or not _is_supported(accessor)
+                else self._group.measure(accessor, f'{name}:{suffix}')
+                for accessor, suffix in (
+                    (member.fget, 'get'), (member.fset, 'set'), (member.fdel, 'del'))]
+            return property(fget, fset, fdel, member.__doc__)
+        return None
+
+    def __enter__(self) -> 'Instrumentation':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._enabled:
+            self.disable()
+
+
+def _is_supported(member: t.Any) -> bool:
+    """Check if the member is a function whose calls can be timed.
+
+    Generator functions are not supported, because their calls only create the generators.
+    """
+    return isinstance(member, types.FunctionType) and not inspect.isgeneratorfunction(member) \
+        and not inspect.isasyncgenfunction(member)
+
+
+def instrument(target: type | types.ModuleType, group: TimingGroup | None = None,
+               include: t.Sequence[str] = ('*',),
+               exclude: t.Sequence[str] = ('_*',)) -> Instrumentation:
+    """Time calls of all functions defined directly in a class or a module.
+
+    Functions, static methods, class methods and properties (each accessor separately)
+    are instrumented for classes. Only functions defined in the module are instrumented
+    for modules. Calls of coroutine functions are timed until the coroutine finishes,
+    and generator functions are skipped.
+
+    Members are selected using fnmatch-style include and exclude patterns of their names.
+    By default, all public members are included.
+
+    Timings are stored in a child of the given group named after the class (in the same
+    recording mode as the given group), or if no group is given, in a group named after
+    the class or module.
+
+    Return the already enabled instrumentation, which can be disabled to restore
+    the original members. It can also be used as a context manager.
+    """
+    if group is None:
+        if isinstance(target, types.ModuleType):
+            group = get_timing_group(target.__name__)
+        else:
+            group = get_timing_group(target.__module__, target.__qualname__)
+    elif not isinstance(target, types.ModuleType):
+        group = get_timing_group(
+            group.name, target.__qualname__, aggregate_only=group.aggregate_only)
+    instrumentation = Instrumentation(target, group, include, exclude)
+    instrumentation.enable()
+    return instrumentation
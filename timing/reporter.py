@@ -0,0 +1,138 @@
+"""Periodic reporting of timing statistics in the background."""
+
+import datetime
+import json
+import logging
+import pathlib
+import threading
+import time
+import typing as t
+
+from .cache import TimingCache
+
+_LOG = logging.getLogger(__name__)
+
+Report = t.Dict[str, t.Any]
+"""Statistics gathered over one reporting interval.
+
+Has the following keys:
+
+- 'timestamp': datetime.datetime when the report was created,
+- 'interval': duration of the reporting interval in seconds,
+- 'groups': mapping from TimingGroup names to their summaries (see TimingGroup.summary).
+"""
+
+Sink = t.Callable[[Report], None]
+
+
+class LoggingSink:  # pylint: disable = too-few-public-methods
+    """Write each report to a logger, one line per timing name."""
+
+    def __init__(self, logger: t.Optional[logging.Logger] = None, level: int = logging.INFO):
+        self._logger = _LOG if logger is None else logger
+        self._level = level
+
+    def __call__(self, report: Report) -> None:
+        for group_name, summary in report['groups'].items():
+            for name, stats in summary.items():
+                self._logger.log(
+                    self._level, '%s.%s: samples=%i, min=%f, max=%f, mean=%f, median=%f,'
+                    ' stddev=%f', group_name, name, stats['samples'], stats['min'],
+                    stats['max'], stats['mean'], stats['median'], stats['stddev'])
+
+
+class JsonLinesSink:  # pylint: disable = too-few-public-methods
+    """Append each report as a single line of JSON to a file."""
+
+    def __init__(self, path: pathlib.Path | str):
+        self._path = pathlib.Path(path)
+
+    def __call__(self, report: Report) -> None:
+        line = json.dumps({
+            'timestamp': report['timestamp'].isoformat(),
+            'interval': report['interval'],
+            'groups': report['groups']})
+        with self._path.open('a', encoding='utf-8') as report_file:
+            print(line, file=report_file)
+
+
+class TimingReporter:
+    """Periodically detach timings from the cache, summarize them and pass results to sinks.
+
+    Each report covers only the timings finished since the previous report, and the reported
+    timings are dropped from the cache afterwards, so memory usage stays bounded.
+
+    Summarization happens on the detached groups, so recording threads are blocked only
+    for the duration of swapping the buffers.
+
+    Use start() and stop(), or use the reporter as a context manager.
+    """
+
+    def __init__(self, interval: float, *sinks: Sink, include_data: bool = False):
+        assert interval > 0, interval
+        assert sinks
+        self._interval = interval
+        self._sinks = sinks
+        self._include_data = include_data
+        self._stopping = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+        self._last_report = time.perf_counter()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def report(self) -> Report:
+        """Create a report immediately and pass it to all sinks."""
+        now = time.perf_counter()
+        snapshots = TimingCache.swap()
+        interval, self._last_report = now - self._last_report, now
+        groups = {}
+        for group_name, snapshot in snapshots.items():
+            if not snapshot and not snapshot.aggregates:
+                continue
+            summary = snapshot.summary
+            if not self._include_data:
+                summary = {
+                    name: {key: value for key, value in stats.items() if key != 'data'}
+                    for name, stats in summary.items()}
+            groups[group_name] = summary
+        report = {'timestamp': datetime.datetime.now(), 'interval': interval, 'groups': groups}
+        for sink in self._sinks:
+            try:
+                sink(report)
+            except Exception:  # pylint: disable = broad-exception-caught
+                _LOG.exception('timing report sink %r failed', sink)
+        return report
+
+    def start(self) -> None:
+        """Start reporting in a background daemon thread."""
+        assert not self.running, 'reporter is already running'
+        self._stopping.clear()
+        self._last_report = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name=f'{type(self).__name__}', daemon=True)
+        self._thread.start()
+
+    def stop(self, final_report: bool = True) -> None:
+        """Stop the background thread, and by default report the remaining timings."""
+        assert self._thread is not None, 'reporter was not started'
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+        if final_report:
+            self.report()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self._interval):
+            try:
+                self.report()
+            except Exception:  # pylint: disable = broad-exception-caught
+                _LOG.exception('timing report failed, will retry in %f seconds', self._interval)
+
+    def __enter__(self) -> 'TimingReporter':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
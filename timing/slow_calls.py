@@ -0,0 +1,71 @@
+"""Capturing context of unusually slow timings."""
+
+import collections
+import datetime
+import sys
+import threading
+import traceback
+import typing as t
+
+import numpy as np
+
+from .timing import Timing
+
+_INTERNAL_MODULES = frozenset({'contextlib', 'timing.group', 'timing.slow_calls'})
+
+
+class SlowCall(t.NamedTuple):
+    """Context of a single timing that exceeded the slow-call threshold."""
+
+    timing: Timing
+    thread: str
+    timestamp: datetime.datetime
+    stack: traceback.StackSummary
+    args: t.Optional[tuple]
+    """Positional arguments of the call, None if measured as context manager."""
+    kwargs: t.Optional[t.Dict[str, t.Any]]
+    """Keyword arguments of the call, None if measured as context manager."""
+
+    @classmethod
+    def capture(cls, timing: Timing, args: t.Optional[tuple] = None,
+                kwargs: t.Optional[t.Dict[str, t.Any]] = None) -> 'SlowCall':
+        """Capture the context of the current thread, skipping frames of the timing package."""
+        frame = sys._getframe(1)  # pylint: disable = protected-access
+        while frame.f_back is not None and frame.f_globals.get('__name__') in _INTERNAL_MODULES:
+            frame = frame.f_back
+        return cls(timing, threading.current_thread().name, datetime.datetime.now(),
+                   traceback.extract_stack(frame), args, kwargs)
+
+
+class RunningPercentile:
+    """Estimate a percentile of recent values using a bounded window.
+
+    The estimate is recomputed only every few updates, so that the per-update cost is small.
+    Until enough values are collected, the estimate is infinite.
+    """
+
+    def __init__(self, percentile: float, window: int = 1000, min_samples: int = 100,
+                 refresh: int = 100):
+        assert 0 < percentile < 100, percentile
+        assert 0 < min_samples <= window, (min_samples, window)
+        assert refresh > 0, refresh
+        self._percentile = percentile
+        self._values: t.Deque[float] = collections.deque(maxlen=window)
+        self._min_samples = min_samples
+        self._refresh = refresh
+        self._countdown = min_samples
+        self._estimate = float('inf')
+
+    @property
+    def estimate(self) -> float:
+        return self._estimate
+
+    def update(self, value: float) -> float:
+        """Add a value and return the estimate from before adding it."""
+        estimate = self._estimate
+        self._values.append(value)
+        self._countdown -= 1
+        if self._countdown <= 0:
+            self._countdown = self._refresh
+            self._estimate = float(np.percentile(list(self._values), self._percentile))
+        return estimate
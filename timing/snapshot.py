@@ -0,0 +1,443 @@
+"""Compact, mergeable snapshots of timing statistics."""
+
+import collections
+import io
+import math
+import struct
+import typing as t
+
+import numpy as np
+
+from .aggregate import TimingAggregate
+from .cache import TimingCache
+from .group import TimingGroup
+
+MAGIC = b'TMSN'
+FORMAT_VERSION = 1
+RELATIVE_ACCURACY = 0.01
+"""Default relative accuracy of quantiles estimated from the sketches."""
+
+_HEADER = struct.Struct('<4sHd')
+_LENGTH = struct.Struct('<I')
+_ACCUMULATORS = struct.Struct('<Qdddd')
+_SKETCH_HEADER = struct.Struct('<iIB')
+_RAW_LENGTH = struct.Struct('<Q')
+
+_SKETCH_DTYPES = ('<u1', '<u2', '<u4', '<u8', '<f8')
+"""Encodings of sketch bucket counts: the narrowest sufficient unsigned integers, or floats
+for weighted sketches."""
+
+_MIN_SKETCHED_VALUE = 1e-9
+"""Elapsed times smaller than this (in seconds) are all counted in the same sketch bucket."""
+
+
+class Accumulators(t.NamedTuple):
+    """Exact statistics of elapsed times, which can be merged.
+
+    Mean and the sum of squared differences from the mean (m2) are kept instead of plain sums,
+    to avoid catastrophic cancellation when calculating the variance.
+    """
+
+    samples: int
+    mean: float
+    m2: float
+    min: float
+    max: float
+
+    @classmethod
+    def from_elapsed(cls, array: np.ndarray) -> 'Accumulators':
+        mean = float(array.mean())
+        return cls(int(array.size), mean, float(np.square(array - mean).sum()),
+                   float(array.min()), float(array.max()))
+
+    @property
+    def var(self) -> float:
+        return self.m2 / self.samples
+
+    def merge(self, other: 'Accumulators') -> 'Accumulators':
+        """Combine accumulators of two disjoint sets of timings using Chan's parallel algorithm."""
+        samples = self.samples + other.samples
+        delta = other.mean - self.mean
+        return Accumulators(
+            samples, self.mean + delta * other.samples / samples,
+            self.m2 + other.m2 + delta ** 2 * self.samples * other.samples / samples,
+            min(self.min, other.min), max(self.max, other.max))
+
+
+class Sketch:
+    """Histogram with logarithmically-sized buckets, which estimates quantiles.
+
+    Bucket i holds count of values in (gamma^(i-1), gamma^i], where
+    gamma = (1 + accuracy) / (1 - accuracy), and therefore quantiles are estimated with relative
+    error of at most the given accuracy. Counts of consecutive buckets starting from the offset
+    are stored densely.
+
+    Counts are integers, unless the sketch is weighted, i.e. built from a sample in which
+    each value represents more than one timing.
+    """
+
+    def __init__(self, offset: int, counts: np.ndarray, accuracy: float = RELATIVE_ACCURACY):
+        assert counts.ndim == 1 and counts.size > 0, counts.shape
+        self.offset = offset
+        self.counts = counts
+        self.accuracy = accuracy
+
+    @classmethod
+    def from_elapsed(cls, array: np.ndarray, accuracy: float = RELATIVE_ACCURACY,
+                     weight: t.Optional[float] = None) -> 'Sketch':
+        """Create sketch of elapsed times, optionally with each of them having the given weight."""
+        gamma = (1 + accuracy) / (1 - accuracy)
+        keys = np.ceil(
+            np.log(np.maximum(array, _MIN_SKETCHED_VALUE)) / math.log(gamma)).astype(np.int64)
+        offset = int(keys.min())
+        counts: np.ndarray = np.bincount(keys - offset)
+        if weight is not None:
+            counts = counts * weight
+        return cls(offset, counts, accuracy)
+
+    @property
+    def weighted(self) -> bool:
+        return self.counts.dtype.kind == 'f'
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-th quantile."""
+        cumulative = np.cumsum(self.counts)
+        index = int(np.searchsorted(cumulative, q * cumulative[-1], side='left'))
+        index = min(index, cumulative.size - 1)
+        gamma = (1 + self.accuracy) / (1 - self.accuracy)
+        return 2 * gamma ** float(self.offset + index) / (gamma + 1)
+
+    def merge(self, other: 'Sketch') -> 'Sketch':
+        """Combine sketches of two disjoint sets of timings."""
+        assert self.accuracy == other.accuracy, (self.accuracy, other.accuracy)
+        offset = min(self.offset, other.offset)
+        end = max(self.offset + self.counts.size, other.offset + other.counts.size)
+        counts = np.zeros(end - offset, dtype=np.result_type(self.counts, other.counts))
+        for sketch in (self, other):
+            start = sketch.offset - offset
+            counts[start:start + sketch.counts.size] += sketch.counts
+        return Sketch(offset, counts, self.accuracy)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sketch):
+            return False
+        return self.offset == other.offset and self.accuracy == other.accuracy \
+            and np.array_equal(self.counts, other.counts)
+
+
+class TimingStats:
+    """Mergeable statistics of timings with one name.
+
+    Consist of exact accumulators, a sketch that estimates quantiles with a bounded relative
+    error, and optionally a column with all raw elapsed times.
+    """
+
+    def __init__(self, accumulators: Accumulators, sketch: Sketch,
+                 raw: t.Optional[np.ndarray] = None):
+        assert accumulators.samples > 0, accumulators
+        assert raw is None or raw.size == accumulators.samples, (raw.size, accumulators.samples)
+        self.accumulators = accumulators
+        self.sketch = sketch
+        self.raw = raw
+
+    @classmethod
+    def from_elapsed(cls, elapsed: t.Sequence[float] | np.ndarray, raw: bool = False,
+                     accuracy: float = RELATIVE_ACCURACY) -> 'TimingStats':
+        """Create statistics from elapsed times."""
+        array = np.asarray(elapsed, dtype=np.float64)
+        assert array.ndim == 1 and array.size > 0, array.shape
+        return cls(Accumulators.from_elapsed(array), Sketch.from_elapsed(array, accuracy),
+                   array.copy() if raw else None)
+
+    @classmethod
+    def from_aggregate(cls, aggregate: TimingAggregate,
+                       accuracy: float = RELATIVE_ACCURACY) -> 'TimingStats':
+        """Create statistics from an aggregate of a group in aggregate-only mode.
+
+        The accumulators are exact, but the sketch is built from the reservoir sample,
+        with each sampled value weighted to represent all aggregated timings.
+        """
+        assert aggregate.count > 0
+        reservoir = np.asarray(aggregate.reservoir, dtype=np.float64)
+        accumulators = Accumulators(
+            aggregate.count, aggregate.mean, aggregate.var * aggregate.count,
+            aggregate.min, aggregate.max)
+        return cls(accumulators, Sketch.from_elapsed(
+            reservoir, accuracy, weight=aggregate.count / reservoir.size))
+
+    @property
+    def count(self) -> int:
+        return self.accumulators.samples
+
+    @property
+    def total(self) -> float:
+        return self.accumulators.mean * self.accumulators.samples
+
+    @property
+    def min(self) -> float:
+        return self.accumulators.min
+
+    @property
+    def max(self) -> float:
+        return self.accumulators.max
+
+    @property
+    def mean(self) -> float:
+        return self.accumulators.mean
+
+    @property
+    def var(self) -> float:
+        return self.accumulators.var
+
+    def quantile(self, q: float) -> float:
+        """Return the q-th quantile, exact if raw data is available, estimated otherwise."""
+        assert 0 <= q <= 1, q
+        if self.raw is not None:
+            return float(np.quantile(self.raw, q))
+        return min(max(self.sketch.quantile(q), self.min), self.max)
+
+    def merge(self, other: 'TimingStats') -> 'TimingStats':
+        """Combine statistics of two disjoint sets of timings.
+
+        Raw data is kept only if both sides have it.
+        """
+        raw = None
+        if self.raw is not None and other.raw is not None:
+            raw = np.concatenate((self.raw, other.raw))
+        return TimingStats(
+            self.accumulators.merge(other.accumulators), self.sketch.merge(other.sketch), raw)
+
+    def summarize(self) -> t.Dict[str, t.Any]:
+        """Return statistics in the same format as TimingGroup.summary entries.
+
+        Raw data is included under 'data' key only if available. Median is exact only if raw
+        data is available.
+        """
+        var = self.var
+        summary = {
+            'samples': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'median': self.quantile(0.5),
+            'var': var,
+            'stddev': math.sqrt(var)}
+        if self.raw is not None:
+            summary['data'] = self.raw.tolist()
+        return summary
+
+    def __eq__(self, other):
+        if not isinstance(other, TimingStats):
+            return False
+        if (self.raw is None) != (other.raw is None):
+            return False
+        return self.accumulators == other.accumulators and self.sketch == other.sketch \
+            and (self.raw is None or np.array_equal(self.raw, other.raw))
+
+    def __str__(self):
+        args = [self.count, self.mean, self.min, self.max]
+        return f'{type(self).__name__}({", ".join([str(_) for _ in args])})'
+
+    def __repr__(self):
+        return str(self)
+
+
+class TimingSnapshot:
+    """Statistics of one or more timing groups, which can be serialized and merged.
+
+    Use to aggregate timings recorded in many processes or on many nodes: create a snapshot
+    from the cache in each of them, send the bytes to an aggregator, and merge snapshots there.
+    """
+
+    def __init__(self, groups: t.Optional[t.Dict[str, t.Dict[str, TimingStats]]] = None,
+                 accuracy: float = RELATIVE_ACCURACY):
+        assert 0 < accuracy < 1, accuracy
+        self.groups: t.Dict[str, t.Dict[str, TimingStats]] = {} if groups is None else groups
+        self.accuracy = accuracy
+
+    @classmethod
+    def from_group(cls, group: TimingGroup, raw: bool = False,
+                   accuracy: float = RELATIVE_ACCURACY) -> 'TimingSnapshot':
+        """Create snapshot of finished timings in a single group."""
+        snapshot = cls(accuracy=accuracy)
+        snapshot.add_group(group, raw)
+        return snapshot
+
+    @classmethod
+    def from_cache(cls, raw: bool = False,
+                   accuracy: float = RELATIVE_ACCURACY) -> 'TimingSnapshot':
+        """Create snapshot of finished timings in all groups in the global cache."""
+        snapshot = cls(accuracy=accuracy)
+        for group in list(TimingCache.flat.values()):
+            snapshot.add_group(group, raw)
+        return snapshot
+
+    def add_group(self, group: TimingGroup, raw: bool = False) -> None:
+        """Add statistics of finished timings from a group, merging them with existing ones.
+
+        For groups in aggregate-only mode raw data is never available.
+        """
+        for name, aggregate in group.aggregates.items():
+            self._add_stats(group.name, name, TimingStats.from_aggregate(aggregate, self.accuracy))
+        for name, timings in list(group.items()):
+            elapsed = [_.elapsed for _ in timings if _.finished]
+            if elapsed:
+                self._add_stats(
+                    group.name, name, TimingStats.from_elapsed(elapsed, raw, self.accuracy))
+
+    def _add_stats(self, group_name: str, name: str, stats: TimingStats) -> None:
+        group = self.groups.setdefault(group_name, {})
+        group[name] = group[name].merge(stats) if name in group else stats
+
+    @classmethod
+    def merge(cls, *snapshots: 'TimingSnapshot') -> 'TimingSnapshot':
+        """Combine many snapshots into one."""
+        assert snapshots
+        merged = cls(accuracy=snapshots[0].accuracy)
+        for snapshot in snapshots:
+            assert snapshot.accuracy == merged.accuracy, (snapshot.accuracy, merged.accuracy)
+            for group_name, group in snapshot.groups.items():
+                for name, stats in group.items():
+                    merged._add_stats(group_name, name, stats)
+        return merged
+
+    @property
+    def summary(self) -> t.Dict[str, t.Dict[str, t.Dict[str, t.Any]]]:
+        """Return statistics of each group in the same format as TimingGroup.summary."""
+        return {
+            group_name: {name: stats.summarize() for name, stats in group.items()}
+            for group_name, group in self.groups.items()}
+
+    @property
+    def hierarchical(self) -> t.Dict[str, dict]:
+        """Return groups of statistics organized in a hierarchy like TimingCache.hierarchical."""
+        hierarchy: t.Dict[str, dict] = collections.OrderedDict()
+        for group_name, group in self.groups.items():
+            level = hierarchy
+            for name_fragment in group_name.split('.'):
+                level = level.setdefault(name_fragment, collections.OrderedDict())
+            level['.'] = group
+        return hierarchy
+
+    def to_bytes(self) -> bytes:
+        """Serialize the snapshot into a compact versioned binary format."""
+        buffer = io.BytesIO()
+        buffer.write(_HEADER.pack(MAGIC, FORMAT_VERSION, self.accuracy))
+        buffer.write(_LENGTH.pack(len(self.groups)))
+        for group_name, group in self.groups.items():
+            _write_str(buffer, group_name)
+            buffer.write(_LENGTH.pack(len(group)))
+            for name, stats in group.items():
+                _write_str(buffer, name)
+                _write_stats(buffer, stats)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'TimingSnapshot':
+        """Deserialize a snapshot created by to_bytes().
+
+        Raise ValueError if the data is not a valid snapshot, e.g. if it is truncated.
+        """
+        view = memoryview(data)
+        _check_available(view, 0, _HEADER.size)
+        magic, version, accuracy = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise ValueError(f'not a timing snapshot, magic bytes are {magic!r}')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'unsupported timing snapshot format version {version}')
+        offset = _HEADER.size
+        snapshot = cls(accuracy=accuracy)
+        groups_count, offset = _read(_LENGTH, view, offset)
+        for _ in range(groups_count):
+            group_name, offset = _read_str(view, offset)
+            group = snapshot.groups.setdefault(group_name, {})
+            names_count, offset = _read(_LENGTH, view, offset)
+            for __ in range(names_count):
+                name, offset = _read_str(view, offset)
+                group[name], offset = _read_stats(view, offset, accuracy)
+        if offset != len(view):
+            raise ValueError(f'{len(view) - offset} trailing bytes after timing snapshot')
+        return snapshot
+
+    def __eq__(self, other):
+        if not isinstance(other, TimingSnapshot):
+            return False
+        return self.accuracy == other.accuracy and self.groups == other.groups
+
+    def __str__(self):
+        args = list(self.groups)
+        return f'{type(self).__name__}({", ".join([str(_) for _ in args])})'
+
+    def __repr__(self):
+        return str(self)
+
+
+def _write_str(buffer: io.BytesIO, text: str) -> None:
+    encoded = text.encode('utf-8')
+    buffer.write(_LENGTH.pack(len(encoded)))
+    buffer.write(encoded)
+
+
+def _check_available(view: memoryview, offset: int, size: int) -> None:
+    if offset + size > len(view):
+        raise ValueError(
+            f'truncated timing snapshot, {size} bytes needed at offset {offset}'
+            f' but only {len(view) - offset} are available')
+
+
+def _read(structure: struct.Struct, view: memoryview, offset: int) -> t.Tuple[int, int]:
+    _check_available(view, offset, structure.size)
+    value, = structure.unpack_from(view, offset)
+    return value, offset + structure.size
+
+
+def _read_str(view: memoryview, offset: int) -> t.Tuple[str, int]:
+    length, offset = _read(_LENGTH, view, offset)
+    _check_available(view, offset, length)
+    return bytes(view[offset:offset + length]).decode('utf-8'), offset + length
+
+
+def _write_stats(buffer: io.BytesIO, stats: TimingStats) -> None:
+    buffer.write(_ACCUMULATORS.pack(*stats.accumulators))
+    counts = stats.sketch.counts
+    if stats.sketch.weighted:
+        dtype_code = len(_SKETCH_DTYPES) - 1
+    else:
+        dtype_code = next(
+            code for code, dtype in enumerate(_SKETCH_DTYPES)
+            if counts.max() <= np.iinfo(dtype).max)
+    buffer.write(_SKETCH_HEADER.pack(stats.sketch.offset, counts.size, dtype_code))
+    buffer.write(counts.astype(_SKETCH_DTYPES[dtype_code]).tobytes())
+    if stats.raw is None:
+        buffer.write(_RAW_LENGTH.pack(0))
+    else:
+        buffer.write(_RAW_LENGTH.pack(stats.raw.size))
+        buffer.write(stats.raw.astype('<f8').tobytes())
+
+
+def _read_stats(view: memoryview, offset: int, accuracy: float) -> t.Tuple[TimingStats, int]:
+    _check_available(view, offset, _ACCUMULATORS.size + _SKETCH_HEADER.size)
+    accumulators = Accumulators(*_ACCUMULATORS.unpack_from(view, offset))
+    offset += _ACCUMULATORS.size
+    sketch_offset, buckets_count, dtype_code = _SKETCH_HEADER.unpack_from(view, offset)
+    offset += _SKETCH_HEADER.size
+    if dtype_code >= len(_SKETCH_DTYPES):
+        raise ValueError(f'unsupported timing snapshot sketch encoding {dtype_code}')
+    if accumulators.samples == 0 or buckets_count == 0:
+        raise ValueError(f'empty timing statistics in timing snapshot at offset {offset}')
+    _check_available(view, offset, buckets_count * np.dtype(_SKETCH_DTYPES[dtype_code]).itemsize)
+    counts = np.frombuffer(
+        view, dtype=_SKETCH_DTYPES[dtype_code], count=buckets_count, offset=offset)
+    offset += counts.nbytes
+    counts = counts.astype(np.float64 if dtype_code == len(_SKETCH_DTYPES) - 1 else np.int64)
+    raw_count, offset = _read(_RAW_LENGTH, view, offset)
+    raw = None
+    if raw_count:
+        if raw_count != accumulators.samples:
+            raise ValueError(
+                f'{raw_count} raw elapsed times in timing snapshot at offset {offset},'
+                f' but {accumulators.samples} were expected')
+        _check_available(view, offset, raw_count * 8)
+        raw = np.frombuffer(view, dtype='<f8', count=raw_count, offset=offset).copy()
+        offset += raw.nbytes
+    return TimingStats(accumulators, Sketch(sketch_offset, counts, accuracy), raw), offset
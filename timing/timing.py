@@ -54,6 +54,15 @@ class Timing:
         assert self._elapsed is not None, 'timing has not finished yet'
         return self._elapsed
 
+    @property
+    def finished(self) -> bool:
+        """Check if the elapsed time is available.
+
+        Unlike checking the state, this is safe while another thread is stopping the timing,
+        because elapsed time is calculated only after the state is changed.
+        """
+        return self._elapsed is not None
+
     @property
     def state(self) -> TimingState:
         return {
@@ -14,8 +14,11 @@ if __debug__:
     _LOG = logging.getLogger(__name__)
 
 
-def get_timing_group(*name_fragments: str) -> TimingGroup:
-    """Work similarly to logging.getLogger()."""
+def get_timing_group(*name_fragments: str, aggregate_only: bool | None = None) -> TimingGroup:
+    """Work similarly to logging.getLogger().
+
+    The aggregate_only mode (see TimingGroup) is used only if the group is created.
+    """
     assert name_fragments
     assert all(isinstance(_, str) and _ for _ in name_fragments), name_fragments
     name = '.'.join(name_fragments)
@@ -34,7 +37,7 @@ def get_timing_group(*name_fragments: str) -> TimingGroup:
                 break
             timing_cache = timing_cache[name_fragment]
 
-    timing_group = TimingGroup(name)
+    timing_group = TimingGroup(name, aggregate_only)
 
     if TimingConfig.enable_cache:
         timing_cache['.'] = timing_group